@@ -1,9 +1,15 @@
 from __future__ import annotations
 import argparse
+import contextlib
+import os
 import shutil
+import stat
+import struct
 import subprocess
 import sys
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 from pathlib import Path
 
 DEFAULT_EXTS = ["jpg", "jpeg", "png", "webp", "bmp", "tif", "tiff"]
@@ -26,12 +32,210 @@ def parse_size(s: str) -> tuple[int, int]:
         raise argparse.ArgumentTypeError("Size must look like 1920x1080")
 
 
-def collect_images(folder: Path, recursive: bool, exts: list[str]) -> list[Path]:
-    exts_lower = {e.lower().lstrip(".") for e in exts}
-    pattern = "**/*" if recursive else "*"
-    files = [p for p in folder.glob(pattern) if p.is_file() and p.suffix.lower().lstrip(".") in exts_lower]
-    files.sort(key=lambda p: p.name.lower())
-    return files
+def _walk_scandir(folder: Path, recursive: bool):
+    """
+    Yield os.DirEntry objects for files under `folder`.
+    Uses the d_type from the directory listing, so regular files need no extra stat.
+    """
+    stack = [os.fspath(folder)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue  # unreadable directory: skip it, as Path.glob did
+        with it:
+            for entry in it:
+                if entry.is_file():
+                    yield entry
+                elif recursive and entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+
+
+def collect_images(folder: Path, recursive: bool, exts: list[str]) -> list[str]:
+    """
+    Return absolute POSIX-style path strings, sorted by lowercased file name.
+    The folder is resolved once; paths stay `str` so the concat builder needs no Path work.
+    """
+    root = folder if folder.is_absolute() else folder.resolve()
+    exts_contains = frozenset(sys.intern(e.lower().lstrip(".")) for e in exts).__contains__
+    keyed = []
+    keyed_append = keyed.append
+    for entry in _walk_scandir(root, recursive):
+        name_lower = entry.name.lower()  # also the sort key, so lowercase once
+        dot = name_lower.rfind(".")
+        if dot > 0 and exts_contains(name_lower[dot + 1:]):  # dotfiles like ".png" have no suffix
+            keyed_append((name_lower, entry.path))
+    # Sort by the precomputed lowercase file name only (not the full path); stable on ties.
+    # itemgetter is C-level, so no Python frame per key and no tuple comparisons
+    keyed.sort(key=itemgetter(0))
+    if os.sep != "/":
+        return [path.replace(os.sep, "/") for _, path in keyed]
+    return [path for _, path in keyed]
+
+
+_PNG_SIG = b"\x89PNG\r\n\x1a\n"
+# JPEG SOFn markers (excluding DHT 0xC4, JPG 0xC8, DAC 0xCC)
+_JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+_O_NOATIME = getattr(os, "O_NOATIME", 0)
+
+
+def _magic(path: str, n: int = 32) -> bytes:
+    """
+    Read at most the first `n` bytes of `path` (magic bytes / small headers).
+    Uses O_NOATIME where available so peeking does not update access times.
+    """
+    flags = os.O_RDONLY | getattr(os, "O_BINARY", 0)
+    try:
+        fd = os.open(path, flags | _O_NOATIME)
+    except PermissionError:
+        if not _O_NOATIME:
+            raise
+        fd = os.open(path, flags)  # O_NOATIME needs file ownership; retry without it
+    try:
+        return os.read(fd, n)
+    finally:
+        os.close(fd)
+
+
+def _probe_dims(path: str) -> tuple[int, int] | None:
+    """
+    Read (width, height) from a PNG IHDR or JPEG SOF header without decoding.
+    Returns None for other formats or malformed files.
+    """
+    try:
+        head = _magic(path)
+        if head[:8] == _PNG_SIG and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:2] != b"\xff\xd8":
+            return None
+        # JPEG: walk the marker segments until the first SOFn
+        with open(path, "rb") as f:
+            f.seek(2)
+            while True:
+                marker = f.read(4)
+                if len(marker) < 4 or marker[0] != 0xFF:
+                    return None
+                kind, seglen = marker[1], struct.unpack(">H", marker[2:])[0]
+                if kind in _JPEG_SOF:
+                    sof = f.read(5)
+                    if len(sof) < 5:
+                        return None
+                    h, w = struct.unpack(">HH", sof[1:5])
+                    return w, h
+                f.seek(seglen - 2, os.SEEK_CUR)
+    except OSError:
+        return None
+
+
+def _detect_pipe_codec(imgs: list[str]) -> str | None:
+    """
+    Return the ffmpeg decoder for image2pipe ("png" or "mjpeg") if every image
+    shares that format by magic bytes, else None (use the concat demuxer).
+    """
+    codec = None
+    for p in imgs:
+        try:
+            head = _magic(p, 8)
+        except OSError:
+            return None
+        if head == _PNG_SIG:
+            kind = "png"
+        elif head[:3] == b"\xff\xd8\xff":
+            kind = "mjpeg"
+        else:
+            return None
+        if codec is None:
+            codec = kind
+        elif kind != codec:
+            return None
+    return codec
+
+
+def _pipe_frames(cmd: list[str], imgs: list[str]) -> None:
+    """
+    Run ffmpeg and write the raw image files to its stdin (image2pipe).
+    Raises CalledProcessError like subprocess.run(check=True).
+    """
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    try:
+        write = proc.stdin.write
+        for p in imgs:
+            with open(p, "rb") as f:
+                write(f.read())
+    except BrokenPipeError:
+        pass  # ffmpeg exited early; its return code tells why
+    except OSError as e:
+        # An image vanished or became unreadable: don't let ffmpeg finalize a truncated video
+        proc.kill()
+        proc.wait()
+        print(f"ERROR: Cannot read image: {e}", file=sys.stderr)
+        raise subprocess.CalledProcessError(1, cmd) from e
+    finally:
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+    retcode = proc.wait()
+    if retcode:
+        raise subprocess.CalledProcessError(retcode, cmd)
+
+
+def _format_cmd(cmd: list[str]) -> str:
+    return " ".join(f'"{c}"' if " " in c else c for c in cmd)
+
+
+def _run_checked(cmd: list[str], input_bytes: bytes | None = None, imgs: list[str] | None = None) -> None:
+    """
+    Run ffmpeg with `input_bytes` (or the raw `imgs` files) on stdin.
+    On failure, print the command and re-raise CalledProcessError.
+    """
+    try:
+        if imgs is not None:
+            _pipe_frames(cmd, imgs)
+        else:
+            subprocess.run(cmd, input=input_bytes, check=True)
+    except subprocess.CalledProcessError:
+        print("ffmpeg failed. Command was:", file=sys.stderr)
+        print(" ".join(cmd), file=sys.stderr)
+        raise
+
+
+def _encode(
+    ffmpeg: str,
+    imgs: list[str],
+    fps: float,
+    pipe_codec: str | None,
+    concat_path: Path | None,
+    out_args: list[str],
+    dry_run: bool,
+    is_last: bool = True,
+) -> None:
+    """
+    Encode `imgs` with one ffmpeg process. `out_args` holds the encoder options and output path.
+    Input is image2pipe when `pipe_codec` is set, else the concat demuxer fed through
+    stdin, or through `concat_path` when given (--concat-file).
+    `is_last` is False for --jobs segments that are followed by another segment.
+    With `dry_run` nothing is written; the command is only printed.
+    """
+    concat_bytes = None
+    if pipe_codec:
+        src_input = ["-f", "image2pipe", "-framerate", str(fps), "-c:v", pipe_codec, "-i", "pipe:0"]
+    elif concat_path is not None:
+        if not dry_run:
+            build_concat_file(imgs, fps, concat_path, is_last)
+        src_input = ["-f", "concat", "-safe", "0", "-i", str(concat_path)]
+    else:
+        src_input = ["-f", "concat", "-safe", "0", "-protocol_whitelist", "file,pipe", "-i", "pipe:0"]
+        if not dry_run:
+            concat_bytes = build_concat_bytes(imgs, fps, is_last, scheme="file:")
+
+    cmd = [ffmpeg, "-y", *src_input, *out_args]
+    if dry_run:
+        print(_format_cmd(cmd))
+        return
+    _run_checked(cmd, concat_bytes, imgs if pipe_codec else None)
 
 
 def _escape_single_quotes(s: str) -> str:
@@ -39,26 +243,46 @@ def _escape_single_quotes(s: str) -> str:
     Escape single quotes for ffmpeg concat file when using single-quoted paths.
     Turn:  abc'def  ->  abc'\\''def
     """
-    return s.replace("'", r"'\''")
+    return s.replace("'", r"'\''") if "'" in s else s
 
 
-def build_concat_file(imgs: list[Path], fps: float, concat_path: Path) -> None:
+def build_concat_bytes(imgs: list[str], fps: float, is_last: bool = True, scheme: str = "") -> bytes:
     """
-    Write concat list as UTF-8 **without BOM** to avoid 'unknown keyword' errors on some ffmpeg builds.
+    Build the concat list as UTF-8 **without BOM** to avoid 'unknown keyword' errors on some ffmpeg builds.
+    `imgs` are absolute POSIX-style paths as returned by collect_images.
+    `scheme="file:"` is needed when the list is read from `pipe:0`: ffmpeg resolves each entry
+    against the list's own URL, so plain paths would become `pipe:/abs/path`.
+    `is_last=False` is for a --jobs segment that is followed by another one: its final image
+    keeps a regular `duration` line and is not repeated.
     """
-    lines = []
-    for i, p in enumerate(imgs):
-        posix = p.resolve().as_posix()
-        posix = _escape_single_quotes(posix)
-        lines.append(f"file '{posix}'\n")
-        if i < len(imgs) - 1:
-            lines.append(f"duration {1.0 / fps}\n")
-    # Repeat last file so last duration is honored
-    last_posix = _escape_single_quotes(imgs[-1].resolve().as_posix())
-    lines.append(f"file '{last_posix}'\n")
+    dur = f"duration {1.0 / fps}\n"
+    resolved = [scheme + _escape_single_quotes(p) for p in imgs]
+    parts = []
+    parts_extend = parts.extend
+    for r in resolved[:-1]:
+        parts_extend(("file '", r, "'\n", dur))
+    last = resolved[-1]
+    if is_last:
+        # Repeat last file so last duration is honored
+        parts_extend(("file '", last, "'\n", "file '", last, "'\n"))
+    else:
+        parts_extend(("file '", last, "'\n", dur))
 
     # ⚠️ No BOM: use plain 'utf-8'
-    concat_path.write_text("".join(lines), encoding="utf-8")
+    return "".join(parts).encode("utf-8")
+
+
+def build_concat_file(imgs: list[str], fps: float, concat_path: Path, is_last: bool = True) -> None:
+    """
+    Write the concat list to `concat_path` (for --concat-file).
+    """
+    buf = memoryview(build_concat_bytes(imgs, fps, is_last))
+    fd = os.open(str(concat_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        while buf:
+            buf = buf[os.write(fd, buf):]
+    finally:
+        os.close(fd)
 
 
 def main(argv: list[str] | None = None) -> int:
@@ -77,11 +301,18 @@ def main(argv: list[str] | None = None) -> int:
     ap.add_argument("--exts", default=",".join(DEFAULT_EXTS), help="Comma-separated extensions (default: jpg,jpeg,png,webp,bmp,tif,tiff)")
     ap.add_argument("--ffmpeg", default=None, help="Path to ffmpeg.exe if not in PATH")
     ap.add_argument("--dry-run", action="store_true", help="Print command without running ffmpeg")
+    ap.add_argument("--threads", type=int, default=0, help="Encoder threads (default: 0 = auto, all cores)")
+    ap.add_argument("--jobs", type=int, default=1, help="Encode N contiguous segments in parallel, then stream-copy them together (default: 1)")
+    ap.add_argument("--concat-file", action="store_true", help="Pass the concat list via a temp file instead of stdin")
     ap.add_argument("--lossless", action="store_true", help="Use lossless x264 (CRF 0) and yuv444p unless overridden")
     args = ap.parse_args(argv)
 
     folder = args.input
-    if not folder.exists() or not folder.is_dir():
+    try:
+        is_dir = stat.S_ISDIR(os.stat(folder).st_mode)
+    except OSError:
+        is_dir = False
+    if not is_dir:
         print(f"ERROR: Input folder does not exist: {folder}", file=sys.stderr)
         return 2
 
@@ -107,51 +338,114 @@ def main(argv: list[str] | None = None) -> int:
         pix_fmt = "yuv420p"
 
     # Build filter graph:
-    # - optional scaling to target size with Lanczos
-    # - ensure even dimensions for codec compatibility
+    # - with --size: a single Lanczos scale to an even width; -2 keeps the height even
+    # - otherwise ensure even dimensions for codec compatibility
+    #   (skipped when the first frame is already even)
     filters = []
     if args.size:
         w, h = args.size
-        filters.append(f"scale={w}:-2:flags=lanczos")
-    filters.append("scale=ceil(iw/2)*2:ceil(ih/2)*2")
+        filters.append(f"scale={w // 2 * 2}:-2:flags=lanczos+accurate_rnd+full_chroma_int")
+    else:
+        dims = _probe_dims(imgs[0])
+        if dims is None or dims[0] % 2 != 0 or dims[1] % 2 != 0:
+            filters.append("scale=ceil(iw/2)*2:ceil(ih/2)*2")
     vf = ",".join(filters) if filters else None
 
-    # Create temp concat file
-    with tempfile.TemporaryDirectory() as td:
-        concat_path = Path(td) / "list.txt"
-        build_concat_file(imgs, args.fps, concat_path)
+    jobs = max(1, min(args.jobs, len(imgs)))
+    # Encoder threads: 0 = let the encoder use all cores. With parallel --jobs segments,
+    # split the cores between them instead of starting one thread per core in every encoder.
+    threads = args.threads
+    if not threads and jobs > 1:
+        threads = max(1, (os.cpu_count() or 1) // jobs)
 
-        cmd = [ffmpeg, "-y", "-f", "concat", "-safe", "0", "-i", str(concat_path), "-r", str(args.fps)]
-        if vf:
-            cmd += ["-vf", vf]
+    # Encoder settings shared by the single encode and every --jobs segment
+    out_args = ["-r", str(args.fps)]
+    if vf:
+        out_args += ["-vf", vf]
 
-        # Codec-specific defaults
-        if codec == "prores_ks":
-            cmd += ["-c:v", "prores_ks", "-profile:v", "3", "-pix_fmt", "yuv422p10le"]
-        else:
-            cmd += ["-c:v", codec, "-crf", str(crf), "-preset", args.preset, "-pix_fmt", pix_fmt]
+    # Codec-specific defaults
+    if codec == "prores_ks":
+        out_args += ["-c:v", "prores_ks", "-profile:v", "3", "-pix_fmt", "yuv422p10le"]
+    else:
+        out_args += ["-c:v", codec, "-crf", str(crf), "-preset", args.preset, "-pix_fmt", pix_fmt]
+        n_threads = threads or os.cpu_count() or 1
+        if codec.startswith("libx264"):
+            out_args += ["-x264-params", f"threads={threads or 'auto'}:lookahead_threads=2"]
+        elif codec.startswith("libx265"):
+            out_args += ["-x265-params", f"pools={threads or '*'}:frame-threads={min(8, n_threads)}"]
 
-        # If libx265 + .mp4, improve compatibility on some players
-        if codec.startswith("libx265") and args.output.suffix.lower() == ".mp4":
-            cmd += ["-tag:v", "hvc1"]
+    # Explicit encoder threading
+    out_args += ["-threads", str(threads)]
 
-        cmd += [str(args.output)]
+    # If libx265 + .mp4, improve compatibility on some players
+    tag_args = []
+    if codec.startswith("libx265") and args.output.suffix.lower() == ".mp4":
+        tag_args = ["-tag:v", "hvc1"]
 
-        if args.dry_run:
-            print(" ".join(f'"{c}"' if " " in c else c for c in cmd))
-            return 0
+    # Uniform PNG/JPEG sets: pipe the raw files with image2pipe (one demuxer, one probe).
+    # Otherwise feed the concat list through stdin; only create a temp file with --concat-file
+    pipe_codec = _detect_pipe_codec(imgs)
+    use_tempdir = jobs > 1 or (args.concat_file and pipe_codec is None)
+    if args.dry_run:
+        # Nothing is written in a dry run; show where the temp files would go
+        tmp_ctx = contextlib.nullcontext("<tmpdir>" if use_tempdir else None)
+    else:
+        tmp_ctx = tempfile.TemporaryDirectory() if use_tempdir else contextlib.nullcontext()
 
+    if not args.dry_run:
         print(f"Found {len(imgs)} images. Encoding to {args.output} ...")
-        try:
-            subprocess.run(cmd, check=True)
-        except subprocess.CalledProcessError as e:
-            print("ffmpeg failed. Command was:", file=sys.stderr)
-            print(" ".join(cmd), file=sys.stderr)
-            return e.returncode
+    try:
+        with tmp_ctx as td:
+            if jobs == 1:
+                concat_path = Path(td) / "list.txt" if td else None
+                _encode(ffmpeg, imgs, args.fps, pipe_codec, concat_path,
+                        [*out_args, *tag_args, str(args.output)], args.dry_run)
+            else:
+                # Encode contiguous shards in parallel, then stream-copy the segments together.
+                # Each segment is a separate encode, so it starts on a keyframe.
+                k, m = divmod(len(imgs), jobs)
+                bounds = [i * k + min(i, m) for i in range(jobs + 1)]
+                # Only the last segment repeats its final frame. The others end on a normal duration
+                # and are capped at one frame per image, so no frame is duplicated at a join.
+                # .mov keeps the encoder timebase (.mkv would force 1 ms timestamps into the output).
+                segs = [Path(td) / f"segment_{i:03d}.mov" for i in range(jobs)]
+                seg_jobs = []
+                for i, seg in enumerate(segs):
+                    chunk = imgs[bounds[i]:bounds[i + 1]]
+                    is_last = i == jobs - 1
+                    cap = [] if is_last else ["-frames:v", str(len(chunk))]
+                    seg_jobs.append((
+                        ffmpeg, chunk, args.fps, pipe_codec,
+                        Path(td) / f"list_{i:03d}.txt" if args.concat_file else None,
+                        [*out_args, *cap, str(seg)], args.dry_run, is_last,
+                    ))
+                if args.dry_run:
+                    for job in seg_jobs:
+                        _encode(*job)  # print in order on the main thread
+                else:
+                    with ThreadPoolExecutor(max_workers=jobs) as ex:
+                        futures = [ex.submit(_encode, *job) for job in seg_jobs]
+                        for fut in futures:
+                            fut.result()
 
-    print("Done.")
-    return 0
+                # The temp dir exists anyway, so the segment list always goes into a file
+                seg_list = Path(td) / "segments.txt"
+                if not args.dry_run:
+                    seg_list.write_bytes(
+                        "".join(f"file '{_escape_single_quotes(seg.as_posix())}'\n" for seg in segs).encode("utf-8")
+                    )
+                src_input = ["-f", "concat", "-safe", "0", "-i", str(seg_list)]
+                cmd = [ffmpeg, "-y", *src_input, "-c", "copy", *tag_args, str(args.output)]
+                if args.dry_run:
+                    print(_format_cmd(cmd))
+                else:
+                    _run_checked(cmd)
+    except subprocess.CalledProcessError as e:
+        return e.returncode
 
+    if not args.dry_run:
+        print("Done.")
+    return 0
 
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -6,50 +6,177 @@ img2vid-bounce
 - 현재 폴더의 이미지들을 '알파벳(사전) 순'으로 인식
 - 구간 [start, end] 또는 [from-name, to-name]을 '앞→뒤'로 만들되
   끝 프레임은 중복하지 않도록 end-1..start를 역순 복제
-- Windows 친화: symlink 미사용, shutil.copy2만 사용
+- Windows 친화: symlink 미사용. 기본은 하드링크, 불가하면 reflink/실제 복사(CopyFileW / sendfile / shutil.copy2)
 - 생성 파일명: <end_stem>_001<ext>, _002<ext>, ...
 """
 
+import errno
 import os
+import re
 import sys
 import argparse
 import shutil
-from typing import List, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import AbstractSet, Dict, List, Optional, Set, Tuple
 
-IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".bmp", ".webp", ".tif", ".tiff"}
+IMAGE_EXTS = frozenset(map(sys.intern, (".png", ".jpg", ".jpeg", ".bmp", ".webp", ".tif", ".tiff")))
 
-def list_images(ext_filter: Optional[Set[str]] = None) -> List[str]:
+def list_images(ext_filter: Optional[AbstractSet[str]] = None) -> List[str]:
+    allowed = (ext_filter or IMAGE_EXTS).__contains__
     files: List[str] = []
-    for f in os.listdir("."):
-        p = os.path.join(".", f)
-        if os.path.isfile(p):
-            ext = os.path.splitext(f)[1].lower()
-            if (ext_filter and ext in ext_filter) or (not ext_filter and ext in IMAGE_EXTS):
-                files.append(f)
-    files.sort(key=str.casefold)  # 대소문자 무시 사전순
+    with os.scandir(".") as it:
+        for entry in it:
+            if entry.is_file():  # d_type 사용 → 대부분 추가 stat 없음
+                name = entry.name
+                dot = name.rfind(".")
+                ext = name[dot:] if dot > 0 else ""
+                # 대부분 이미 소문자 → lower()는 불일치 시에만
+                if allowed(ext) or allowed(ext.lower()):
+                    files.append(name)
+    # 대소문자 무시 사전순: ASCII 이름뿐이면 lower()와 casefold()가 같으므로 더 가벼운 lower 사용
+    files.sort(key=str.lower if all(map(str.isascii, files)) else str.casefold)
     return files
 
-def index_from_name(files: List[str], name: str) -> int:
-    try:
-        return files.index(name)
-    except ValueError:
+def index_from_name(name_to_idx: Dict[str, int], name: str) -> int:
+    idx = name_to_idx.get(name)
+    if idx is None:
         sys.exit(f"[오류] 지정한 파일을 찾을 수 없습니다: {name}")
+    return idx
 
 def find_free_block(end_stem: str, end_ext: str, count: int) -> int:
     """
     end_stem_###.ext 형태에서, ###가 count개 연속으로 비어 있는 첫 시작 번호를 반환.
+    디렉터리는 한 번만 읽고, 사용 중인 번호 사이의 빈 구간을 찾는다.
     """
-    n = 1
+    # Linux 외(Windows/macOS 등)는 대소문자 무시 파일시스템일 수 있으므로 casefold로 비교
+    fold = (lambda x: x) if sys.platform.startswith("linux") else str.casefold
+    pattern = re.compile(re.escape(fold(end_stem)) + r"_(\d{3,})" + re.escape(fold(end_ext)))
+    used: Set[int] = set()
+    for name in os.listdir("."):
+        m = pattern.fullmatch(fold(name))
+        if m:
+            i = int(m.group(1))
+            if f"{i:03d}" == m.group(1):  # 생성 규칙({i:03d})과 정확히 같은 이름만
+                used.add(i)
+
     while True:
-        ok = True
-        for i in range(n, n + count):
-            candidate = f"{end_stem}_{i:03d}{end_ext}"
-            if os.path.exists(candidate):
-                ok = False
+        n = 1
+        for u in sorted(used):
+            if u >= n + count:
                 break
-        if ok:
+            if u >= n:
+                n = u + 1  # 사용 중인 번호 바로 뒤에서 다시 탐색
+        # 최종 확인: 대소문자 무시 마운트 등 목록 비교로 놓친 충돌은 os.path.exists로 잡는다
+        taken = [i for i in range(n, n + count) if os.path.exists(f"{end_stem}_{i:03d}{end_ext}")]
+        if not taken:
             return n
-        n += 1  # 한 칸씩 뒤로 밀며 탐색
+        used.update(taken)
+
+def _kernel_copy(src: str, dst: str) -> None:
+    """
+    플랫폼별 커널 복사. 지원하지 않는 플랫폼이면 shutil.copy2.
+    - Windows: kernel32.CopyFileW (커널에서 복사, 수정 시각 보존)
+    - Linux: os.sendfile 루프 + fchmod + os.utime
+    """
+    if sys.platform == "win32":
+        import ctypes
+        if not ctypes.windll.kernel32.CopyFileW(os.path.abspath(src), os.path.abspath(dst), False):
+            raise ctypes.WinError()
+        return
+    if not sys.platform.startswith("linux"):
+        shutil.copy2(src, dst)
+        return
+
+    in_fd = os.open(src, os.O_RDONLY)
+    try:
+        st = os.fstat(in_fd)
+        out_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, st.st_mode & 0o777)
+        try:
+            os.fchmod(out_fd, st.st_mode & 0o7777)  # umask 무시, copy2처럼 권한 그대로
+            while os.sendfile(out_fd, in_fd, None, 1 << 20):
+                pass
+        finally:
+            os.close(out_fd)
+    finally:
+        os.close(in_fd)
+    os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+def _fast_copy(src: str, dst: str) -> None:
+    """
+    shutil.copy2 대체: 파일 내용, 권한, 타임스탬프를 복사.
+    커널 복사가 실패하면 반쯤 쓰인 dst를 지우고 shutil.copy2로 다시 복사.
+    """
+    try:
+        _kernel_copy(src, dst)
+    except OSError:
+        try:
+            os.unlink(dst)
+        except FileNotFoundError:
+            pass
+        shutil.copy2(src, dst)
+
+_FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+
+def _reflink(src: str, dst: str) -> None:
+    """
+    Linux FICLONE ioctl (Btrfs/XFS 등)로 데이터 블록을 공유하는 복사본 생성.
+    지원하지 않는 파일시스템/플랫폼이면 OSError.
+    """
+    if not sys.platform.startswith("linux"):
+        raise OSError("reflink is only supported on Linux")
+    import fcntl
+
+    in_fd = os.open(src, os.O_RDONLY)
+    try:
+        st = os.fstat(in_fd)
+        out_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, st.st_mode & 0o777)  # 기존 파일은 덮어쓰지 않음
+        try:
+            fcntl.ioctl(out_fd, _FICLONE, in_fd)
+        except OSError:
+            os.close(out_fd)
+            os.unlink(dst)
+            raise
+        os.close(out_fd)
+    finally:
+        os.close(in_fd)
+    os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+# 하드링크 자체를 지원하지 않음을 뜻하는 오류만 다음 방식으로 대체 (FileExistsError 등은 그대로 전파)
+_NO_LINK_ERRNOS = frozenset(
+    getattr(errno, name) for name in ("EXDEV", "EPERM", "ENOTSUP", "EOPNOTSUPP", "EMLINK", "ENOSYS")
+    if hasattr(errno, name)
+)
+# Windows: ERROR_INVALID_FUNCTION(FAT 등), ERROR_NOT_SAME_DEVICE, ERROR_NOT_SUPPORTED, ERROR_TOO_MANY_LINKS
+_NO_LINK_WINERRORS = frozenset({1, 17, 50, 1142})
+
+def _link_unsupported(e: OSError) -> bool:
+    return e.errno in _NO_LINK_ERRNOS or getattr(e, "winerror", None) in _NO_LINK_WINERRORS
+
+def _place_frame(src: str, dst: str, mode: str) -> None:
+    """
+    mode: link → 하드링크, 실패 시 reflink → 복사
+          reflink → reflink, 실패 시 복사
+          copy → 항상 복사
+    ffmpeg는 이 파일들을 읽기만 하므로 내용을 공유해도 안전하다.
+    """
+    if mode == "link":
+        try:
+            os.link(src, dst)
+            return
+        except FileExistsError:
+            raise
+        except OSError as e:
+            if not _link_unsupported(e):
+                raise
+    if mode in ("link", "reflink"):
+        try:
+            _reflink(src, dst)
+            return
+        except FileExistsError:
+            raise
+        except OSError:
+            pass  # FICLONE 미지원 파일시스템/플랫폼
+    _fast_copy(src, dst)
 
 def parse_args() -> argparse.Namespace:
     ap = argparse.ArgumentParser(
@@ -65,16 +192,18 @@ def parse_args() -> argparse.Namespace:
     ap.add_argument("--to-name", type=str, help="끝 파일명 (알파벳 정렬 기준에 존재해야 함)")
 
     ap.add_argument("--exts", nargs="*", help="확장자 필터(예: --exts .png .jpg). 미지정 시 일반 이미지 확장자 전체.")
+    ap.add_argument("--copy-mode", choices=["link", "reflink", "copy"], default="link",
+                    help="프레임 생성 방식: link(하드링크, 기본) / reflink / copy. 지원하지 않으면 다음 방식으로 대체.")
     ap.add_argument("--dry-run", action="store_true", help="복사하지 않고 계획만 출력")
     return ap.parse_args()
 
-def resolve_range(files: List[str], args: argparse.Namespace) -> Tuple[int, int]:
+def resolve_range(files: List[str], name_to_idx: Dict[str, int], args: argparse.Namespace) -> Tuple[int, int]:
     # 1) 파일명 기반이 우선
     if (args.__dict__.get("from_name") is not None) or (args.__dict__.get("to_name") is not None):
         if not (args.from_name and args.to_name):
             sys.exit("[오류] --from-name 과 --to-name 을 함께 지정하세요.")
-        s0 = index_from_name(files, args.from_name)
-        e0 = index_from_name(files, args.to_name)
+        s0 = index_from_name(name_to_idx, args.from_name)
+        e0 = index_from_name(name_to_idx, args.to_name)
 
     # 2) 인덱스 기반
     elif (args.start is not None) or (args.end is not None):
@@ -95,15 +224,16 @@ def main() -> None:
     args = parse_args()
 
     # 확장자 필터
-    ext_filter: Optional[Set[str]] = None
+    ext_filter: Optional[AbstractSet[str]] = None
     if args.exts:
-        ext_filter = set(e.lower() if e.startswith(".") else "." + e.lower() for e in args.exts)
+        ext_filter = frozenset(sys.intern(e.lower() if e.startswith(".") else "." + e.lower()) for e in args.exts)
 
     files = list_images(ext_filter)
     if not files:
         sys.exit("[오류] 현재 폴더에서 이미지 파일을 찾지 못했습니다.")
 
-    s0, e0 = resolve_range(files, args)
+    name_to_idx = {n: i for i, n in enumerate(files)}  # 파일명 → 인덱스 (O(1) 조회)
+    s0, e0 = resolve_range(files, name_to_idx, args)
 
     # 끝 프레임은 중복하지 않음 → e0-1 down to s0
     src_indices = list(range(e0 - 1, s0 - 1, -1))
@@ -120,16 +250,19 @@ def main() -> None:
     print(f"[정보] 끝 파일: {end_file}")
     print(f"[정보] 생성 예정: {len(src_indices)}개 (끝 프레임 중복 없음)")
 
-    created = []
-    for k, src_i in enumerate(src_indices, start=start_block):
-        src = files[src_i]
-        dst = f"{end_stem}_{k:03d}{end_ext}"
-        if args.dry_run:
+    plan = [(files[src_i], f"{end_stem}_{k:03d}{end_ext}")
+            for k, src_i in enumerate(src_indices, start=start_block)]
+    if args.dry_run:
+        for src, dst in plan:
             print(f"[DRY] {src} -> {dst}")
-        else:
-            shutil.copy2(src, dst)
-            print(f"{src} -> {dst}")
-        created.append(dst)
+    else:
+        # 프레임별 링크/복사는 서로 독립적인 디스크 I/O → 스레드로 병렬 처리 (출력 순서는 유지)
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as ex:
+            futures = [(src, dst, ex.submit(_place_frame, src, dst, args.copy_mode)) for src, dst in plan]
+            for src, dst, fut in futures:
+                fut.result()
+                print(f"{src} -> {dst}")
+    created = [dst for _, dst in plan]
 
     # 인접 미리보기
     preview = files[:e0+1] + created + files[e0+1:]